@@ -26,6 +26,7 @@
 #include <sys/time.h>
 #include <unistd.h>
 #include <string.h>
+#include <math.h>
 #include <fcntl.h>
 #include "rtypes.h"
 #include "rconvert.h"
@@ -39,19 +40,20 @@ void parsePyPrm(struct RadarParm *prm, PyObject *pyprm)
 
 }*/
 
+/*the offsets are read and set on the descriptor itself with lseek, rather
+  than through a FILE from fdopen, which would allocate a new stream (that
+  is never freed) on every call*/
 static PyObject *
 get_dmap_offset(PyObject *self, PyObject *args)
 {
   int fd;
   long offset;
-  FILE* fp=NULL;
   if(!PyArg_ParseTuple(args, "i", &fd))
     return NULL;
   else
   {
     PyObject *recordOffset = NULL;
-    fp = fdopen(fd,"r");
-    offset=ftell(fp);
+    offset=lseek(fd,0,SEEK_CUR);
     recordOffset=PyInt_FromLong(offset);
     return recordOffset;
   }  
@@ -62,14 +64,11 @@ set_dmap_offset(PyObject *self, PyObject *args)
 {
   int fd;
   long offset,noffset;
-  FILE* fp=NULL;
   if(!PyArg_ParseTuple(args, "il", &fd,&offset))
     return NULL;
   else
   {
-    fp = fdopen(fd,"r");
-    fseek(fp,offset,SEEK_SET);
-    noffset=ftell(fp);
+    noffset=lseek(fd,offset,SEEK_SET);
     if (noffset==offset) {
       Py_RETURN_TRUE;
     } else {
@@ -280,11 +279,255 @@ read_dmap_rec(PyObject *self, PyObject *args)
 }
 
 
-static PyMethodDef dmapioMethods[] = 
+/*a read-ahead buffer over a file descriptor, so that many dmap records
+  are pulled in with a single read() instead of three reads per record*/
+#define DMAP_READ_AHEAD 1048576
+
+struct DmapReader
+{
+  int fd;
+  long base;           /*file offset of buf[0]*/
+  unsigned char *buf;
+  int size;            /*allocated size of buf*/
+  int len;             /*number of bytes read into buf*/
+  int pos;             /*start of the next record in buf*/
+};
+
+/*make sure at least num bytes from pos onwards are in the buffer.
+  returns 0 on success and -1 at end of file or on error*/
+static int
+dmap_reader_fill(struct DmapReader *r, int num)
+{
+  int st;
+  unsigned char *tmp;
+  if(r->len-r->pos >= num)
+    return 0;
+
+  /*move the unused bytes to the front of the buffer*/
+  memmove(r->buf,r->buf+r->pos,r->len-r->pos);
+  r->base+=r->pos;
+  r->len-=r->pos;
+  r->pos=0;
+  if(num > r->size)
+  {
+    tmp=realloc(r->buf,num);
+    if(tmp == NULL)
+      return -1;
+    r->buf=tmp;
+    r->size=num;
+  }
+  while(r->len < num)
+  {
+    st=read(r->fd,r->buf+r->len,r->size-r->len);
+    if(st <= 0)
+      return -1;
+    r->len+=st;
+  }
+  return 0;
+}
+
+/*decode the next record in the buffer and set offset to where it
+  starts in the file.  returns NULL at end of file or on error*/
+static struct DataMap *
+dmap_reader_next(struct DmapReader *r, long *offset)
+{
+  int32 code,sze;
+  struct DataMap *ptr;
+  if(dmap_reader_fill(r,2*sizeof(int32)) == -1)
+    return NULL;
+  ConvertToInt(r->buf+r->pos,&code);
+  ConvertToInt(r->buf+r->pos+sizeof(int32),&sze);
+  if(sze < 4*(int)sizeof(int32))
+    return NULL;
+  if(dmap_reader_fill(r,sze) == -1)
+    return NULL;
+  ptr=DataMapDecodeBuffer(r->buf+r->pos,sze);
+  if(ptr == NULL)
+    return NULL;
+  *offset=r->base+r->pos;
+  r->pos+=sze;
+  return ptr;
+}
+
+/*convert a UTC date and time to seconds since the epoch.  This gives the
+  same result as TimeYMDHMSToEpoch, but that function sets the TZ
+  environment variable around mktime, which changes it for the whole
+  process and so cannot be called with the GIL released.  Out of range
+  months and days are carried over as mktime does.  The day count uses
+  the days from civil algorithm of H. Hinnant*/
+static double
+dmap_epoch(int yr, int mo, int dy, int hr, int mt, double sec)
+{
+  long y,m,era,yoe,doy,doe,days,clock;
+  double isec=floor(sec);
+
+  /*bring the month into 1..12, carrying into the year*/
+  y=yr+(mo-1)/12;
+  m=(mo-1)%12;
+  if(m < 0)
+  {
+    m+=12;
+    y--;
+  }
+  m++;
+
+  y-=(m <= 2);
+  era=(y >= 0 ? y : y-399)/400;
+  yoe=y-era*400;
+  doy=(153*(m+(m > 2 ? -3 : 9))+2)/5;
+  doe=yoe*365+yoe/4-yoe/100+doy;
+  days=era*146097+doe-719468+(dy-1);
+
+  clock=days*86400+hr*3600L+mt*60L+(long)isec;
+  return clock+(sec-isec);
+}
+
+/*walk every record from the current offset to the end of the file and
+  return (times, offsets, scans) lists for the records whose epoch time
+  falls within [stime, etime].  Only the scalars needed for the index
+  are looked at, so no python objects are built per record*/
+static PyObject *
+build_dmap_index(PyObject *self, PyObject *args)
+{
+  int fd;
+  double stime,etime;
+  if(!PyArg_ParseTuple(args, "idd", &fd, &stime, &etime))
+    return NULL;
+  else
+  {
+    int c,n=0,nalloc=0,nomem=0,yr=0,mo=0,dy=0,hr=0,mt=0,sc=0,us=0,scan=0;
+    long offset;
+    double epoch;
+    double *times=NULL;
+    long *offsets=NULL;
+    char *scans=NULL;
+    void *tmp;
+    struct DataMap *ptr;
+    struct DataMapScalar *s;
+    struct DmapReader reader;
+    PyObject *timeList=NULL,*offsetList=NULL,*scanList=NULL,*item;
+
+    reader.fd=fd;
+    reader.base=lseek(fd,0,SEEK_CUR);
+    reader.size=DMAP_READ_AHEAD;
+    reader.len=0;
+    reader.pos=0;
+    reader.buf=malloc(reader.size);
+    if(reader.buf == NULL)
+      return PyErr_NoMemory();
+
+    Py_BEGIN_ALLOW_THREADS
+    while(1)
+    {
+      ptr = dmap_reader_next(&reader,&offset);
+      if(ptr == NULL)
+        break;
+
+      yr=mo=dy=hr=mt=sc=us=scan=0;
+      for (c=0;c<ptr->snum;c++)
+      {
+        s=ptr->scl[c];
+        if ((strcmp(s->name,"time.yr")==0) && (s->type==DATASHORT))
+          yr=*(s->data.sptr);
+        else if ((strcmp(s->name,"time.mo")==0) && (s->type==DATASHORT))
+          mo=*(s->data.sptr);
+        else if ((strcmp(s->name,"time.dy")==0) && (s->type==DATASHORT))
+          dy=*(s->data.sptr);
+        else if ((strcmp(s->name,"time.hr")==0) && (s->type==DATASHORT))
+          hr=*(s->data.sptr);
+        else if ((strcmp(s->name,"time.mt")==0) && (s->type==DATASHORT))
+          mt=*(s->data.sptr);
+        else if ((strcmp(s->name,"time.sc")==0) && (s->type==DATASHORT))
+          sc=*(s->data.sptr);
+        else if ((strcmp(s->name,"time.us")==0) && (s->type==DATAINT))
+          us=(int)(((int)(*(s->data.iptr)*1e-3))*1e3);
+        else if ((strcmp(s->name,"scan")==0) && (s->type==DATASHORT))
+          scan=*(s->data.sptr);
+        else if ((strcmp(s->name,"scan")==0) && (s->type==DATAINT))
+          scan=*(s->data.iptr);
+      }
+      DataMapFree(ptr);
+
+      epoch = dmap_epoch(yr,mo,dy,hr,mt,(double)sc+us/1.e6);
+      if((epoch < stime) || (epoch > etime))
+        continue;
+
+      if(n == nalloc)
+      {
+        nalloc = (nalloc == 0) ? 1024 : 2*nalloc;
+        tmp = realloc(times,nalloc*sizeof(double));
+        if(tmp == NULL) { nomem = 1; break; }
+        times = tmp;
+        tmp = realloc(offsets,nalloc*sizeof(long));
+        if(tmp == NULL) { nomem = 1; break; }
+        offsets = tmp;
+        tmp = realloc(scans,nalloc*sizeof(char));
+        if(tmp == NULL) { nomem = 1; break; }
+        scans = tmp;
+      }
+      times[n] = epoch;
+      offsets[n] = offset;
+      scans[n] = (scan == 1);
+      n++;
+    }
+    /*leave the file just after the last record read, as readDmapRec does*/
+    lseek(fd,reader.base+reader.pos,SEEK_SET);
+    Py_END_ALLOW_THREADS
+    free(reader.buf);
+
+    if(nomem)
+    {
+      free(times);
+      free(offsets);
+      free(scans);
+      return PyErr_NoMemory();
+    }
+
+    timeList = PyList_New(n);
+    offsetList = PyList_New(n);
+    scanList = PyList_New(n);
+    if((timeList == NULL) || (offsetList == NULL) || (scanList == NULL))
+      goto fail;
+    for(c=0;c<n;c++)
+    {
+      item=PyFloat_FromDouble(times[c]);
+      if(item == NULL)
+        goto fail;
+      PyList_SET_ITEM(timeList,c,item);
+      item=PyInt_FromLong(offsets[c]);
+      if(item == NULL)
+        goto fail;
+      PyList_SET_ITEM(offsetList,c,item);
+      item=PyInt_FromLong(scans[c]);
+      if(item == NULL)
+        goto fail;
+      PyList_SET_ITEM(scanList,c,item);
+    }
+    free(times);
+    free(offsets);
+    free(scans);
+
+    return Py_BuildValue("(NNN)",timeList,offsetList,scanList);
+
+  fail:
+    /*the unfilled list items are NULL, which the list dealloc skips*/
+    Py_XDECREF(timeList);
+    Py_XDECREF(offsetList);
+    Py_XDECREF(scanList);
+    free(times);
+    free(offsets);
+    free(scans);
+    return NULL;
+  }
+}
+
+
+static PyMethodDef dmapioMethods[] =
 {
   {"readDmapRec",  read_dmap_rec, METH_VARARGS, "read a dmap record"},
   {"getDmapOffset",  get_dmap_offset, METH_VARARGS, "get current dmap file offset"},
   {"setDmapOffset",  set_dmap_offset, METH_VARARGS, "set dmap file offset"},
+  {"buildDmapIndex",  build_dmap_index, METH_VARARGS, "index record times, offsets and scan flags within a time window"},
 
   {NULL, NULL, 0, NULL}        /* Sentinel */
 };
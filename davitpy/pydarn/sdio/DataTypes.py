@@ -28,9 +28,36 @@ Classes
 ---------
   * :class:`pydarn.sdio.DataTypes.DataPtr`
 
+Functions
+----------
+  * :func:`pydarn.sdio.DataTypes.buildIndexes`
+
 """
 
+import datetime as dt
 import logging
+import multiprocessing
+import os
+import Queue
+import tempfile
+import threading
+import types
+import zipfile
+
+import numpy as np
+
+# the dmapio functions are looked up when they are called, so that this
+# module still imports if the C extension failed to build
+from davitpy.pydarn import dmapio
+
+__all__ = ['DataPtr', 'buildIndexes', 'testing']
+
+
+def _epochSeconds(t):
+    """Convert a datetime to seconds since the epoch, the time format used
+    by the records."""
+    return (t - dt.datetime(1970, 1, 1)).total_seconds()
+
 
 class DataPtr(object):
     """A generalized data pointer class which contains general methods for
@@ -48,9 +75,11 @@ class DataPtr(object):
     dType : (str)
         the file data type, 'dmap','hdf5'
     recordIndex : (dict)
-        look up dictionary for file offsets for all records 
+        look up dictionary for file offsets for all records, built from
+        the index arrays the first time it is accessed
     scanStartIndex : (dict)
-        look up dictionary for file offsets for scan start records
+        look up dictionary for file offsets for scan start records, built
+        from the index arrays the first time it is accessed
 
     Private Attributes
     -------------------
@@ -60,6 +89,14 @@ class DataPtr(object):
         the file descriptor 
     filename : (str)
         the name of the currently open file
+    times : (numpy.ndarray)
+        epoch times of the indexed records, in file order
+    offsets : (numpy.ndarray)
+        file offsets of the indexed records, in ascending order
+    scans : (numpy.ndarray)
+        boolean flags marking which of the indexed records start a scan
+    offsetSet : (frozenset)
+        the same offsets, for checking seeks against the index
 
     Methods
     ---------
@@ -76,6 +113,12 @@ class DataPtr(object):
         rewind file back to the beginning 
     read
         read record at current file offset in to a dictionary
+    readAhead
+        iterate over the records like read, reading ahead in the background
+    seekToTime
+        Seek file to the first indexed record at or after a time
+    offsetsInRange
+        File offsets of the indexed records within a time range
  
     Written by ASR 20140822
     """
@@ -94,40 +137,34 @@ class DataPtr(object):
     # method to use.
     #
     # To add support for another data type, one needs to do 2 things:
-    #     1) There are 5 methods that are data type specific:
-    #        read, createIndex, offsetSeek, offsetTell, and rewind
+    #     1) There are 6 methods that are data type specific:
+    #        read, createIndex, offsetSeek, offsetTell, rewind, and the
+    #        private _buildIndex, which fills the index arrays without
+    #        building the recordIndex/scanStartIndex dictionaries
     #        One must create a method for each one of these (see examples
     #        at the end of this class).
-    #     2) Each method needs to be registered in the method dictionaries 
-    #        in the __init__ of this class. The keys in each dictionary 
-    #        are the data types and the values are the method names for 
-    #        those dictionary types, ie) __read is the read methods 
-    #        dictionary, where __read = {'dmap':self.__readDmap} points
+    #     2) Each method needs to be registered in the method dictionaries
+    #        at the end of this class. The keys in each dictionary
+    #        are the data types and the values are the methods for
+    #        those dictionary types, ie) _READ is the read methods
+    #        dictionary, where _READ = {'dmap':__readDmap} points
     #        to the __readDmap method for the dmap data type.
     #####################
 
-    def __init__(self, stime, datatype, eTime=None, fileName=None):
-
-        import davitpy.pydarn
-        import datetime as dt
-
-        # Data type method dictionaries to select the data type 
-        # specific methods to use credit to Adam Knox (github 
-        # @aknox-va) for the idea.          
+    # The index of each dmap file is saved next to it as
+    # <filename><_INDEX_SUFFIX>.  Bump _INDEX_VERSION whenever the
+    # contents of that file change.
+    _INDEX_SUFFIX = '.didx'
+    _INDEX_VERSION = 1
 
-        __read = {'dmap':self.__readDmap}
-        __createIndex = {'dmap':self.__createIndexDmap}
-        __offsetSeek = {'dmap':self.__offsetSeekDmap}
-        __offsetTell = {'dmap':self.__offsetTellDmap}
-        __rewind = {'dmap':self.__rewindDmap}
-        datatypelist = __read.keys()
+    def __init__(self, stime, datatype, eTime=None, fileName=None):
 
         # Check input variables
-        estr = "datatype: {:} not supported.  ".format(str(datatype))
-        estr = "{:s}Supported data types: {:}".format(estr, str(datatypelist))
         assert isinstance(stime, dt.datetime), \
             logging.error('stime must be datetime object')
-        assert datatype in datatypelist, logging.error(estr)
+        assert datatype in DataPtr._DATATYPES, logging.error(
+            "datatype: {:} not supported.  Supported data types: {:}".format(
+                str(datatype), str(sorted(DataPtr._DATATYPES))))
         assert eTime == None or isinstance(eTime, dt.datetime), \
             logging.error('eTime must be datetime object or None')
 
@@ -135,41 +172,241 @@ class DataPtr(object):
         self.sTime = stime
         self.eTime = eTime
         self.dType = datatype
-        self.recordIndex = None
-        self.scanStartIndex = None
+        # the time window as seconds since the epoch, which is what the
+        # records store their time as, so the read loops can compare the
+        # raw record times without building datetimes
+        self._sEpoch = _epochSeconds(stime)
+        if eTime is None:
+            self._eEpoch = float('inf')
+        else:
+            self._eEpoch = _epochSeconds(eTime)
+        self._times = None
+        self._offsets = None
+        self._scans = None
+        self._offsetSet = None
+        self._sortedTimes = None
+        self._sortedOffsets = None
+        self._recordIndex = None
+        self._scanStartIndex = None
         self._filename = fileName 
         self._fd = None
         self._ptr =  None
 
         # Set the data Type specific methods
-        self.read = __read[datatype]
-        self.createIndex = __createIndex[datatype]
-        self.offsetSeek = __offsetSeek[datatype]
-        self.offsetTell = __offsetTell[datatype]
-        self.rewind = __rewind[datatype]
+        self.read = types.MethodType(DataPtr._READ[datatype], self)
+        self.createIndex = types.MethodType(DataPtr._CREATE_INDEX[datatype],
+                                            self)
+        self.offsetSeek = types.MethodType(DataPtr._OFFSET_SEEK[datatype],
+                                           self)
+        self.offsetTell = types.MethodType(DataPtr._OFFSET_TELL[datatype],
+                                           self)
+        self.rewind = types.MethodType(DataPtr._REWIND[datatype], self)
+        self._buildIndex = types.MethodType(DataPtr._BUILD_INDEX[datatype],
+                                            self)
 
 
     # FIRST, THE GENERAL COMMON METHODS
 
+    @property
+    def recordIndex(self):
+        """Look up dictionary for file offsets for all records.  Only built
+        from the index arrays when it is first asked for.
+        """
+        if self._recordIndex is None and self._times is not None:
+            rectimes = map(dt.datetime.utcfromtimestamp, self._times.tolist())
+            self._recordIndex = dict(zip(rectimes, self._offsets.tolist()))
+        return self._recordIndex
+
+    @recordIndex.setter
+    def recordIndex(self, recordDict):
+        # keep the scan start records, which are flagged in the arrays
+        scanStartDict = self.scanStartIndex
+        if recordDict is None:
+            self._setIndex(None, None, None)
+        else:
+            items = sorted(recordDict.items(), key=lambda item: item[1])
+            self._setIndex(np.array([_epochSeconds(rectime)
+                                     for rectime, _ in items],
+                                    dtype=np.float64),
+                           np.array([offset for _, offset in items],
+                                    dtype=np.int64), None)
+        self._recordIndex = recordDict
+        self.scanStartIndex = scanStartDict
+
+    @property
+    def scanStartIndex(self):
+        """Look up dictionary for file offsets for scan start records.  Only
+        built from the index arrays when it is first asked for.
+        """
+        if self._scanStartIndex is None and self._scans is not None:
+            rectimes = map(dt.datetime.utcfromtimestamp,
+                           self._times[self._scans].tolist())
+            self._scanStartIndex = dict(
+                zip(rectimes, self._offsets[self._scans].tolist()))
+        return self._scanStartIndex
+
+    @scanStartIndex.setter
+    def scanStartIndex(self, scanStartDict):
+        self._scanStartIndex = scanStartDict
+        # without scan starts there are no flags, so that reading
+        # scanStartIndex gives back None rather than an empty dictionary
+        if self._offsets is None or scanStartDict is None:
+            self._scans = None
+        else:
+            self._scans = np.in1d(self._offsets,
+                                  np.array(scanStartDict.values(),
+                                           dtype=np.int64))
+
+    def _setIndex(self, times, offsets, scans):
+        """ Replace the index with the given arrays of record times, record
+        offsets (sorted) and scan start flags.
+        """
+        self._times = times
+        self._offsets = offsets
+        self._scans = scans
+        self._offsetSet = None
+        self._sortedTimes = None
+        self._sortedOffsets = None
+        self._recordIndex = None
+        self._scanStartIndex = None
+
+    def _timeSortedIndex(self):
+        """ The index record times and offsets, ordered by time.  The index
+        is created first if there is none yet.
+        """
+        if self._times is None:
+            self._buildIndex()
+        if self._sortedTimes is None:
+            order = np.argsort(self._times, kind='mergesort')
+            self._sortedTimes = self._times[order]
+            self._sortedOffsets = self._offsets[order]
+        return self._sortedTimes, self._sortedOffsets
+
+    def seekToTime(self, t):
+        """ Seek to the first indexed record at or after the given time.
+        Unlike looking up an offset in recordIndex, the time does not have
+        to match a record time exactly.  Exact record times, as used for
+        the recordIndex keys, still seek to that record.
+
+        Parameters
+        -----------
+        t : (datetime)
+            the time to seek to
+
+        Returns
+        --------
+        found : (bool)
+            True if there is such a record and the file was moved to it
+        """
+        times, offsets = self._timeSortedIndex()
+        # record times only have microsecond precision, so allow for the
+        # rounding in converting a record's datetime back to an epoch time
+        i = np.searchsorted(times, _epochSeconds(t) - 5e-7)
+        if i == len(times):
+            return False
+        return self.offsetSeek(int(offsets[i]), force=True)
+
+    def offsetsInRange(self, t0, t1):
+        """ The offsets of all indexed records from t0 to t1 inclusive,
+        found by binary search rather than by looking through recordIndex.
+
+        Parameters
+        -----------
+        t0 : (datetime)
+            the start of the time range
+        t1 : (datetime)
+            the end of the time range
+
+        Returns
+        --------
+        offsets : (numpy.ndarray)
+            the record offsets, ordered by record time
+        """
+        times, offsets = self._timeSortedIndex()
+        # allow for microsecond rounding as in seekToTime
+        i0 = np.searchsorted(times, _epochSeconds(t0) - 5e-7, side='left')
+        i1 = np.searchsorted(times, _epochSeconds(t1) + 5e-7, side='right')
+        return offsets[i0:i1]
+
     def __del__(self):
-        self.close() 
+        # never raise from the finalizer, ie) at interpreter shutdown or
+        # when __init__ failed before the file attributes were set
+        try:
+            self.close()
+        except Exception:
+            pass
 
     def __iter__(self):
         return self
      
     def open(self):
         """open the associated filename."""
-        import os
         self._fd = os.open(self._filename, os.O_RDONLY)
         self._ptr = os.fdopen(self._fd)
  
     def close(self):
-        """ Close the associated file.
+        """ Close the associated file.  Closing an already closed file
+        does nothing.
         """
-        import os
         if self._ptr is not None:
+            # closing the file object also closes its file descriptor
             self._ptr.close()
-            self._fd = None
+        elif self._fd is not None:
+            os.close(self._fd)
+        self._ptr = None
+        self._fd = None
+
+    def readAhead(self, depth=32):
+        """ A generator yielding the same records as repeated calls to
+        read, while a background thread reads up to depth records ahead so
+        that reading the file overlaps with processing the records.
+
+        The file offset is left just after the last record yielded.  Do not
+        call read, offsetSeek or rewind until the generator is exhausted or
+        closed.
+
+        Parameters
+        -----------
+        depth : (int)
+            the largest number of records to read ahead.  The background
+            thread waits whenever this many records have not been used yet.
+        """
+        records = Queue.Queue(maxsize=depth)
+        stop = threading.Event()
+
+        def worker():
+            try:
+                while not stop.is_set():
+                    dfile = self.read()
+                    records.put((dfile, self.offsetTell()))
+                    if dfile is None:
+                        return
+            except Exception, e:
+                records.put((e, None))
+
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        lastOffset = self.offsetTell()
+        thread.start()
+        try:
+            while True:
+                dfile, offset = records.get()
+                if isinstance(dfile, Exception):
+                    raise dfile
+                lastOffset = offset
+                if dfile is None:
+                    break
+                yield dfile
+        finally:
+            stop.set()
+            # keep emptying the queue so the worker is never stuck on a put
+            while thread.is_alive():
+                try:
+                    records.get_nowait()
+                except Queue.Empty:
+                    thread.join(0.01)
+            if lastOffset is not None:
+                self.offsetSeek(lastOffset, force=True)
 
 
     # BEGIN DATA TYPE SPECIFIC HIDDEN METHODS
@@ -185,55 +422,133 @@ class DataPtr(object):
         # This method will have to do different things depending 
         # on self.dType (for future other data file support ie. hdf5)
 
-        import datetime as dt
-        from davitpy.pydarn.dmapio import getDmapOffset, readDmapRec
-        from davitpy.pydarn.dmapio import setDmapOffset
-
-        recordDict = {}
-        scanStartDict = {}
-        starting_offset = self.__offsetTellDmap()
-        # rewind back to start of file
-        self.__rewindDmap()
-        while(1):
-            # read the next record from the dmap file
-            offset = getDmapOffset(self._fd)
-            dfile = readDmapRec(self._fd)
-            if dfile is None:
-                # if we dont have valid data, clean up, get out
-                print '\nreached end of data'
-                break
-            else:
-                if(dt.datetime.utcfromtimestamp(dfile['time']) >= self.sTime and
-                   dt.datetime.utcfromtimestamp(dfile['time']) <= self.eTime): 
-                    rectime = dt.datetime.utcfromtimestamp(dfile['time'])
-                    recordDict[rectime] = offset
-                    if dfile['scan'] == 1:
-                        scanStartDict[rectime] = offset
-        # reset back to before building the index
-        self.recordIndex = recordDict
-        self.__offsetSeekDmap(starting_offset)
-        self.scanStartIndex = scanStartDict
-        return recordDict, scanStartDict
+        self.__buildIndexDmap()
+        return self.recordIndex, self.scanStartIndex
+
+    def __buildIndexDmap(self, scan=True):
+        """ Fill the sorted index arrays of record times and offsets.
+
+        Parameters
+        -----------
+        scan : (bool)
+            whether to read through the whole file when there is no usable
+            sidecar index file
+
+        Returns
+        --------
+        built : (bool)
+            True if the index arrays were filled
+        """
+        index = self.__loadIndexDmap()
+        if index is None:
+            if not scan:
+                return False
+            starting_offset = self.__offsetTellDmap()
+            # rewind back to start of file
+            self.__rewindDmap()
+            # stat the file before walking it, so records appended during
+            # the walk make the saved sidecar stale rather than hiding them
+            stat = os.fstat(self._fd)
+            # walk the whole file in C.  The records are walked forward so
+            # the offsets come back sorted.
+            times, offsets, scans = dmapio.buildDmapIndex(
+                self._fd, float('-inf'), float('inf'))
+            index = (np.array(times, dtype=np.float64),
+                     np.array(offsets, dtype=np.int64),
+                     np.array(scans, dtype=np.bool_))
+            self.__saveIndexDmap(stat, *index)
+            # reset back to before building the index
+            dmapio.setDmapOffset(self._fd, starting_offset)
+
+        # keep only the records in the time window
+        times, offsets, scans = index
+        inWindow = (times >= self._sEpoch) & (times <= self._eEpoch)
+        self._setIndex(times[inWindow], offsets[inWindow], scans[inWindow])
+        return True
+
+    def __loadIndexDmap(self):
+        """ Read the index of the whole file from its sidecar file.
+
+        Returns
+        --------
+        index : (tuple/NoneType)
+            The (times, offsets, scans) arrays, or None if there is no
+            sidecar file or it does not match the data file any more
+        """
+        stat = os.fstat(self._fd)
+        try:
+            with open(self._filename + self._INDEX_SUFFIX, 'rb') as f:
+                sidecar = np.load(f, allow_pickle=False)
+                if(sidecar['version'] != self._INDEX_VERSION or
+                   sidecar['mtime'] != stat.st_mtime or
+                   sidecar['size'] != stat.st_size):
+                    return None
+                return sidecar['times'], sidecar['offsets'], sidecar['scans']
+        except (IOError, OSError, KeyError, ValueError, zipfile.BadZipfile):
+            return None
+
+    def __saveIndexDmap(self, stat, times, offsets, scans):
+        """ Write the index of the whole file to its sidecar file, so that
+        later sessions do not have to scan the file again.
+
+        Parameters
+        -----------
+        stat : (posix.stat_result)
+            os.fstat of the data file taken before the index was built
+        """
+        sidecarName = self._filename + self._INDEX_SUFFIX
+        # write to a uniquely named temporary file first, so a partly
+        # written sidecar is never picked up, even with several processes
+        # indexing the same file at once
+        try:
+            tmpFd, tmpName = tempfile.mkstemp(
+                dir=os.path.dirname(os.path.abspath(sidecarName)),
+                prefix=os.path.basename(sidecarName) + '.', suffix='.tmp')
+        except (IOError, OSError):
+            logging.debug('could not write index file ' + sidecarName)
+            return
+        try:
+            with os.fdopen(tmpFd, 'wb') as f:
+                np.savez(f, version=self._INDEX_VERSION, mtime=stat.st_mtime,
+                         size=stat.st_size, times=times, offsets=offsets,
+                         scans=scans)
+            # mkstemp makes the file private, so give it the read/write
+            # permissions of the data file instead
+            os.chmod(tmpName, stat.st_mode & 0o666)
+            os.rename(tmpName, sidecarName)
+        except (IOError, OSError):
+            logging.debug('could not write index file ' + sidecarName)
+            try:
+                os.remove(tmpName)
+            except OSError:
+                pass
 
     def __offsetSeekDmap(self, offset, force=False):
         """ Jump to dmap record at supplied byte offset.
-        Require offset to be in record index list unless forced. 
+        Require offset to be in record index list unless forced.  If no
+        index has been built and there is no sidecar index file to load,
+        the offset is only required to be inside the file, rather than
+        reading the whole file to build the index.
         """
         # This method will have to do different things depending 
         # on self.dType (for future other data file support ie. hdf5)
 
-        from davitpy.pydarn.dmapio import setDmapOffset, getDmapOffset
-
         if force:
-            return setDmapOffset(self._fd, offset)
+            return dmapio.setDmapOffset(self._fd, offset)
         else:
-            if self.recordIndex is None:        
-                self.__createIndexDmap()
-
-            if offset in self.recordIndex.values():
-                return setDmapOffset(self._fd, offset)
+            if(self._offsets is None and
+               not self.__buildIndexDmap(scan=False)):
+                if 0 <= offset < os.fstat(self._fd).st_size:
+                    return dmapio.setDmapOffset(self._fd, offset)
+                else:
+                    return dmapio.getDmapOffset(self._fd)
+            if self._offsetSet is None:
+                self._offsetSet = frozenset(self._offsets.tolist())
+
+            if offset in self._offsetSet:
+                return dmapio.setDmapOffset(self._fd, offset)
             else:
-                return getDmapOffset(self._fd)
+                return dmapio.getDmapOffset(self._fd)
 
     def __offsetTellDmap(self):
         """ Jump to dmap record at supplied byte offset.
@@ -242,8 +557,7 @@ class DataPtr(object):
         # This method will have to do different things depending 
         # on self.dType (for future other data file support ie. hdf5)
 
-        from davitpy.pydarn.dmapio import getDmapOffset
-        return getDmapOffset(self._fd)
+        return dmapio.getDmapOffset(self._fd)
 
     def __rewindDmap(self):
         """ Jump to beginning of dmap file.
@@ -251,8 +565,7 @@ class DataPtr(object):
 
         # This method will have to do different things depending 
         # on self.dType (for future other data file support ie. hdf5)
-        from davitpy.pydarn.dmapio import setDmapOffset 
-        return setDmapOffset(self._fd, 0)
+        return dmapio.setDmapOffset(self._fd, 0)
 
     def __readDmap(self):
        """ A function to read a single record of data from a dmap file.
@@ -266,9 +579,6 @@ class DataPtr(object):
        # This method will have to do different things depending 
        # on self.dType (for future other data file support ie. hdf5)
 
-       from davitpy import pydarn
-       import datetime as dt
-
        # check input
        if self._ptr == None:
            logging.error('your pointer does not point to any data')
@@ -278,22 +588,31 @@ class DataPtr(object):
            logging.error('your file pointer is closed')
            return None
 
+       # bind the loop lookups to locals once
+       fd = self._fd
+       _readDmapRec = dmapio.readDmapRec
+       sEpoch = self._sEpoch
+       eEpoch = self._eEpoch
+
        # do this until we reach the requested start time
        # and have a parameter match
        while(1):
-           offset = pydarn.dmapio.getDmapOffset(self._fd)
-           dfile = pydarn.dmapio.readDmapRec(self._fd)
+           dfile = _readDmapRec(fd)
            # check for valid data
-           if(dfile == None or
-              dt.datetime.utcfromtimestamp(dfile['time']) > self.eTime):
+           if dfile is None:
                # if we dont have valid data, clean up, get out
-               print '\nreached end of data'
+               logging.debug('reached end of data')
                return None
 
-           # check that we're in the time window
-           if(dt.datetime.utcfromtimestamp(dfile['time']) >= self.sTime and
-              dt.datetime.utcfromtimestamp(dfile['time']) <= self.eTime):
-               return dfile
+           # stop once we are past the time window and skip records before
+           # it, so anything left is in the window
+           t = dfile['time']
+           if t > eEpoch:
+               logging.debug('reached end of data')
+               return None
+           if t < sEpoch:
+               continue
+           return dfile
 
     ########################################
     #    NEW DATATYPE TEMPLATE METHODS
@@ -305,6 +624,8 @@ class DataPtr(object):
         pass
     def __createIndexNewDatatype(self):
         pass
+    def __buildIndexNewDatatype(self):
+        pass
     def __offsetSeekNewDatatype(self):
         pass
     def __offsetTellDatatype(self):
@@ -312,11 +633,79 @@ class DataPtr(object):
     def __rewindDatatype(self):
         pass
 
+    ########################################
+    #    DATA TYPE METHOD DICTIONARIES
+    ########################################
+
+    # Data type method dictionaries to select the data type
+    # specific methods to use credit to Adam Knox (github
+    # @aknox-va) for the idea.  They are built once with the class
+    # and the methods are bound to each instance in __init__.
+
+    _READ = {'dmap':__readDmap}
+    _CREATE_INDEX = {'dmap':__createIndexDmap}
+    _OFFSET_SEEK = {'dmap':__offsetSeekDmap}
+    _OFFSET_TELL = {'dmap':__offsetTellDmap}
+    _REWIND = {'dmap':__rewindDmap}
+    _BUILD_INDEX = {'dmap':__buildIndexDmap}
+    _DATATYPES = frozenset(_READ)
+
+
+def _indexFile(args):
+    """Index a single file in a worker process for buildIndexes, returning
+    its index arrays."""
+    fileName, datatype, sTime, eTime = args
+    ptr = DataPtr(sTime, datatype, eTime=eTime, fileName=fileName)
+    ptr.open()
+    try:
+        ptr._buildIndex()
+        return ptr._times, ptr._offsets, ptr._scans
+    finally:
+        ptr.close()
+
+
+def buildIndexes(fileList, datatype, sTime, eTime=None, workers=None):
+    """Index many data files at once, one file per worker process.
+
+    Parameters
+    -----------
+    fileList : (list)
+        the names of the files to index
+    datatype : (str)
+        the file data type, 'dmap','hdf5'
+    sTime : (datetime)
+        start time of the request
+    eTime : (datetime/NoneType)
+        end time of the request
+    workers : (int/NoneType)
+        the number of worker processes.  Defaults to the number of CPUs.
+
+    Returns
+    --------
+    ptrs : (list)
+        A DataPtr for each file, in the order of fileList, with its
+        recordIndex and scanStartIndex already built.  The files are not
+        opened.
+    """
+    pool = multiprocessing.Pool(processes=workers)
+    try:
+        indexes = pool.map(_indexFile, [(fileName, datatype, sTime, eTime)
+                                        for fileName in fileList])
+    finally:
+        pool.close()
+        pool.join()
+
+    ptrs = []
+    for fileName, index in zip(fileList, indexes):
+        ptr = DataPtr(sTime, datatype, eTime=eTime, fileName=fileName)
+        ptr._setIndex(*index)
+        ptrs.append(ptr)
+    return ptrs
+
 
 # Class used for testing
 class testing(DataPtr):
     def __init__(self, stime, datatype, etime, filename):
-        import datetime as dt
         super(testing, self).__init__(stime, datatype, eTime=etime,
                                       fileName=filename)
 
@@ -364,13 +753,28 @@ if __name__=="__main__":
 
 
     print " Getting file offsets as a function of timestamp..."
-    index, _ = t.createIndex()
+    index, scanIndex = t.createIndex()
     if isinstance(index, dict):
         print "   SUCCESS!"
     else:
         print "   FAILED!"
 
 
+    print " Getting the same offsets again from the saved index file..."
+    sidecar = files[0] + DataPtr._INDEX_SUFFIX
+    inode = os.stat(sidecar).st_ino
+    t2 = pydarn.sdio.DataTypes.testing(stime, 'dmap', eTime, files[0])
+    t2.open()
+    index2, scanIndex2 = t2.createIndex()
+    t2.close()
+    # the index file is replaced whenever the data file is scanned again
+    if(index2 == index and scanIndex2 == scanIndex and
+       os.stat(sidecar).st_ino == inode):
+        print "   SUCCESS!"
+    else:
+        print "   FAILED!"
+
+
     print " Seeking to file offset at datetime(2012,11,24,4,4,39,141000)"
     t.offsetSeek(index[datetime.datetime(2012, 11, 24, 4, 4, 39, 141000)])
     offset = t.offsetTell()
@@ -382,6 +786,43 @@ if __name__=="__main__":
                 str(index[datetime.datetime(2012, 11, 24, 4, 4, 39, 141000)]),
                                                      str(offset))
 
+    print " Seeking to the first record after datetime(2012,11,24,4,4,39)"
+    t.seekToTime(datetime.datetime(2012, 11, 24, 4, 4, 39))
+    if(t.offsetTell() ==
+       index[datetime.datetime(2012, 11, 24, 4, 4, 39, 141000)]):
+        print "   SUCCESS!"
+    else:
+        print "   FAILED!"
+
+
+    print " Counting the records between the start and end times..."
+    offsets = t.offsetsInRange(stime, eTime)
+    print " Should get: {:} and we got: {:}".format(str(len(index)),
+                                                     str(len(offsets)))
+
+
+    print " Reading ahead in the background..."
+    t.rewind()
+    times = []
+    dfile = t.read()
+    while dfile is not None:
+        times.append(dfile['time'])
+        dfile = t.read()
+    t.rewind()
+    if [dfile['time'] for dfile in t.readAhead()] == times:
+        print "   SUCCESS!"
+    else:
+        print "   FAILED!"
+
+
+    print " Indexing the file in a worker process..."
+    ptrs = buildIndexes([files[0]], 'dmap', stime, eTime=eTime, workers=1)
+    if(ptrs[0].recordIndex == index and
+       ptrs[0].scanStartIndex == scanIndex):
+        print "   SUCCESS!"
+    else:
+        print "   FAILED!"
+
     print " Rewinding the file..."
     t.rewind()
     print "    ...rewound! (Success!)"